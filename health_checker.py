@@ -7,24 +7,136 @@ with student authentication and token management capabilities.
 
 Usage:
     python health_checker.py --username USERNAME --pin PIN [options]
+    python health_checker.py --batch CSV [options]
     
 Options:
     -v, --verbose       Show detailed JSON responses
     --show-token        Display the JWT token after registration
     --token-only        Only register and show token, skip health checks
-    --provider PROVIDER Test only specific provider (openai, anthropic, opensource)
+    --provider PROVIDER Test only specific provider (openai, anthropic, opensource, all)
+    --use-cache         Reuse provider results that passed recently
+    --assert-content    Also require each reply to contain the expected text
+    --json              Print one machine-readable JSON document
+    --batch CSV         Check every username,pin row of a CSV file concurrently
+    --concurrency N     Maximum users checked at once in --batch mode
     --username USERNAME Username for authentication (required if not in .env)
     --pin PIN           PIN for authentication (required if not in .env)
     --help              Show this help message
 """
 
 import argparse
-import json
+import csv
+import functools
+import hashlib
+import io
+import ipaddress
 import os
+import random
+import secrets
+import socket
 import sys
-from typing import Dict, Any, Optional, List
-import httpx
-from dotenv import load_dotenv
+import tempfile
+import time
+import urllib.parse
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Tuple
+import orjson
+
+# asyncio, httpx and dotenv are imported where they are first needed so that
+# --help and argument errors do not pay for loading them
+if TYPE_CHECKING:
+    import asyncio
+    import httpx
+
+# Tokens and recent provider results are reused across runs from this file
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'aitools-hc', 'state.json')
+
+# PBKDF2 rounds for the PIN hash kept in the cache; PINs are short, so the hash
+# must be slow for guessing them from a copy of the file to be expensive
+PIN_HASH_ITERATIONS = 200_000
+
+# Longest pause between retries of a provider request, in seconds
+MAX_BACKOFF = 2.0
+
+# Seconds to wait on the proxy when PROXY_TIMEOUT is not set
+DEFAULT_PROXY_TIMEOUT = 30
+
+# Config values that mean "not configured", including those shipped in the sample .env
+_PLACEHOLDERS = frozenset({
+    'your_openai_api_key_here',
+    'your_openai_org_id_here',
+    'your_anthropic_api_key_here',
+    None,
+    ''
+})
+
+@dataclass(frozen=True, slots=True)
+class ProviderSpec:
+    """How to health-check one provider through the proxy."""
+    name: str
+    display_name: str
+    path: str
+    model: str
+    # Config keys that must be set for the check to run
+    required_config_keys: Tuple[str, ...] = ()
+    # (header, config key) pairs, sent only when the config value is set
+    extra_headers: Tuple[Tuple[str, str], ...] = ()
+
+@dataclass(slots=True)
+class ProviderResult:
+    """Outcome of one provider health check."""
+    provider: str
+    status_code: int
+    success: bool
+    # Wall-clock time across every attempt, including backoff between retries
+    response_time: float
+    # Part of response_time spent on TCP connect and TLS handshake
+    connect_time: float = 0.0
+    # Requests sent, counting retries
+    attempts: int = 1
+    error: Optional[str] = None
+    # Parsed response body, shown in the verbose report; only parsed in verbose mode
+    full_response: Optional[Dict[str, Any]] = None
+    # True when reported from the cache instead of a live request
+    cached: bool = False
+
+PROVIDER_SPECS = (
+    ProviderSpec(
+        name="opensource",
+        display_name="Opensource",
+        path="/opensource/v1/chat/completions",
+        model="openai--gpt-oss-120b"
+    ),
+    ProviderSpec(
+        name="openai",
+        display_name="OpenAI",
+        path="/openai/v1/chat/completions",
+        model="gpt-3.5-turbo",
+        required_config_keys=("OPENAI_API_KEY",),
+        extra_headers=(("X-User-OpenAI-Key", "OPENAI_API_KEY"), ("X-User-OpenAI-Org", "OPENAI_ORG_ID"))
+    ),
+    ProviderSpec(
+        name="anthropic",
+        display_name="Anthropic",
+        path="/anthropic/v1/messages",
+        model="claude-3-haiku-20240307",
+        required_config_keys=("ANTHROPIC_API_KEY",),
+        extra_headers=(("X-User-Anthropic-Key", "ANTHROPIC_API_KEY"),)
+    )
+)
+PROVIDER_SPECS_BY_NAME = {spec.name: spec for spec in PROVIDER_SPECS}
+
+# Text every provider is asked to reply with; checked by --assert-content
+EXPECTED_CONTENT = b"Health check successful"
+
+# Request bodies are identical on every run, so they are serialized once and shared
+_HEALTH_MESSAGES = [
+    {"role": "user", "content": "Say 'Health check successful' and nothing else."}
+]
+_PAYLOADS = {
+    spec.name: orjson.dumps({"model": spec.model, "messages": _HEALTH_MESSAGES, "max_tokens": 10, "stream": False})
+    for spec in PROVIDER_SPECS
+}
 
 # Color codes for terminal output
 class Colors:
@@ -37,269 +149,555 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
+# ANSI codes are only worth emitting when a terminal will render them
+_USE_COLOR = sys.stdout.isatty()
+
+def colorize(text: str, color: str = Colors.WHITE) -> str:
+    """Wrap text in a color code, or return it unchanged when stdout is not a terminal."""
+    if not _USE_COLOR:
+        return text
+    return f"{color}{text}{Colors.END}"
+
 def print_colored(text: str, color: str = Colors.WHITE) -> None:
     """Print colored text to terminal."""
-    print(f"{color}{text}{Colors.END}")
+    print(colorize(text, color))
+
+# Fixed report fragments, wrapped in their color codes once at import
+_END = Colors.END if _USE_COLOR else ""
+_HEADER_TOP = colorize(f"\n{'='*60}", Colors.CYAN + Colors.BOLD)
+_HEADER_BOTTOM = colorize('='*60, Colors.CYAN)
+_HEADER_TITLE_START = Colors.CYAN + Colors.BOLD if _USE_COLOR else ""
+_STATUS_COLOR = {"PASS": Colors.GREEN, "FAIL": Colors.RED} if _USE_COLOR else {"PASS": "", "FAIL": ""}
+_STATUS_TAG = {"PASS": "[PASS]   ", "FAIL": "[FAIL]   "}
+_PROVIDER_LABEL = {spec.name: f"{spec.display_name:<12} " for spec in PROVIDER_SPECS}
+# Colored "<Provider> [STATUS] " prefix for every known provider and status
+_STATUS_PREFIX = {
+    (name, status): _STATUS_COLOR[status] + label + tag
+    for name, label in _PROVIDER_LABEL.items()
+    for status, tag in _STATUS_TAG.items()
+}
 
 def print_header(text: str) -> None:
     """Print a formatted header."""
-    print_colored(f"\n{Colors.BOLD}{'='*60}", Colors.CYAN)
-    print_colored(f"{text.center(60)}", Colors.CYAN + Colors.BOLD)
-    print_colored(f"{'='*60}{Colors.END}", Colors.CYAN)
+    print(f"{_HEADER_TOP}\n{_HEADER_TITLE_START}{text.center(60)}{_END}\n{_HEADER_BOTTOM}")
+
+def format_status(provider: str, status: str, details: str = "") -> str:
+    """Format provider status with color coding."""
+    return _STATUS_PREFIX[(provider, status)] + details + _END
+
+def emit_json(data: Dict[str, Any]) -> None:
+    """Write one JSON document to stdout for --json consumers."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE))
+    sys.stdout.buffer.flush()
+
+def summarize(results: List[ProviderResult]) -> Dict[str, int]:
+    """Count total, passed and failed results."""
+    passed = sum(1 for r in results if r.success)
+    return {"total": len(results), "passed": passed, "failed": len(results) - passed}
+
+def _connect_time(timings: Dict[str, float]) -> float:
+    """Seconds from TCP connect to the end of the TLS handshake, from httpcore trace events."""
+    start = timings.get("connection.connect_tcp.started")
+    end = timings.get("connection.start_tls.complete", timings.get("connection.connect_tcp.complete"))
+    if start is None or end is None:
+        return 0.0
+    return end - start
 
-def print_status(provider: str, status: str, details: str = "") -> None:
-    """Print provider status with color coding."""
-    color = Colors.GREEN if status == "PASS" else Colors.RED
-    status_text = f"[{status}]".ljust(8)
-    provider_text = provider.ljust(12)
-    print_colored(f"{provider_text} {status_text} {details}", color)
+def describe_error(e: BaseException) -> str:
+    """Exception message, or its class name for exceptions raised without one (e.g. timeouts)."""
+    return str(e) or type(e).__name__
+
+def load_cache() -> Dict[str, Any]:
+    """Load cached tokens and provider results, ignoring a missing or corrupt file."""
+    try:
+        with open(CACHE_PATH, 'rb') as f:
+            cache = orjson.loads(f.read())
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache: Dict[str, Any]) -> None:
+    """Persist the cache; it holds JWT tokens so it is only readable by the owner."""
+    cache_dir = os.path.dirname(CACHE_PATH)
+    tmp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Each writer gets its own temp file, so concurrent runs cannot truncate
+        # each other's before the atomic replace
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='state.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps(cache))
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+def hash_pin(username: str, pin: str, salt: str) -> str:
+    """Salted PBKDF2 hash of a PIN, used to tell whether a cache entry belongs to it."""
+    return hashlib.pbkdf2_hmac(
+        'sha256', pin.encode(), f"{salt}:{username}".encode(), PIN_HASH_ITERATIONS
+    ).hex()
+
+def resolve_base_url(base_url: str) -> Tuple[str, Optional[str]]:
+    """Resolve a plain-http base URL's host once, for connecting by IP.
+    
+    Returns the URL with its host replaced by an IP address and the Host header to
+    send, or the URL unchanged and None when it is https (the hostname is needed
+    for TLS), carries user:pass@ credentials, an HTTP_PROXY / ALL_PROXY is set in
+    the environment, it is already an IP address, or does not resolve to exactly
+    one address. A host with several addresses is left to the connector,
+    which falls back between them (Happy Eyeballs) on failure.
+    """
+    import urllib.request
+    
+    url = urllib.parse.urlsplit(base_url)
+    if url.scheme != 'http' or not url.hostname or '@' in url.netloc:
+        return base_url, None
+    # httpx matches NO_PROXY against the URL's host, so a pinned IP could send a
+    # bypassed host through the proxy; the proxy resolves the name itself anyway
+    proxies = urllib.request.getproxies_environment()
+    if proxies.get('http') or proxies.get('all'):
+        return base_url, None
+    try:
+        ipaddress.ip_address(url.hostname)
+        return base_url, None
+    except ValueError:
+        pass
+    
+    try:
+        addresses = {
+            (family, sockaddr[0])
+            for family, _, _, _, sockaddr in socket.getaddrinfo(url.hostname, url.port or 80, type=socket.SOCK_STREAM)
+        }
+    except OSError:
+        # Let the first request report the resolution failure
+        return base_url, None
+    if len(addresses) != 1:
+        return base_url, None
+    
+    family, address = addresses.pop()
+    ip = f"[{address}]" if family == socket.AF_INET6 else address
+    port = f":{url.port}" if url.port else ""
+    return url._replace(netloc=f"{ip}{port}").geturl(), f"{url.hostname}{port}"
+
+def create_client(config: Dict[str, Any], max_connections: int = 8) -> "httpx.AsyncClient":
+    """Create an AsyncClient tuned for talking to PROXY_BASE_URL."""
+    import httpx
+    
+    # Every connection in the pool would otherwise ask the resolver again, so
+    # plain-http proxies are resolved once up front and reached by IP
+    base_url, host_header = config['PROXY_BASE_URL'], None
+    if config.get('PROXY_PIN_DNS', True):
+        base_url, host_header = resolve_base_url(base_url)
+    
+    # All requests target the same origin, so the pool warmed by registration is
+    # reused (and multiplexed over HTTP/2) by every provider check. http2 and
+    # limits go to the client rather than a custom transport, which would turn
+    # off HTTP_PROXY/HTTPS_PROXY/ALL_PROXY/NO_PROXY support.
+    # A tight connect timeout fails fast when the proxy is unreachable, while the
+    # read timeout leaves room for a slow upstream LLM
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Host": host_header} if host_header else None,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60
+        ),
+        timeout=httpx.Timeout(
+            connect=2.0,
+            read=config.get('PROXY_TIMEOUT', DEFAULT_PROXY_TIMEOUT),
+            write=5.0,
+            pool=1.0
+        )
+    )
 
 class HealthChecker:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], client: Optional["httpx.AsyncClient"] = None,
+                 cache: Optional[Dict[str, Any]] = None, quiet: bool = False):
+        """Create a checker for one user.
+        
+        Pass a shared client and cache to check many users at once; the checker then
+        leaves closing the client and saving the cache to their owner. With quiet,
+        nothing is printed.
+        """
         self.config = config
+        self.quiet = quiet
         self.jwt_token: Optional[str] = None
-        self.client = httpx.Client(timeout=config.get('PROXY_TIMEOUT', 30))
+        self.registration_error: Optional[str] = None
+        # Set by register_user; a cached token may have been revoked by the proxy
+        self.token_from_cache = False
+        self._credentials: Optional[Tuple[str, str]] = None
+        self._auth_header: Dict[str, str] = {}
+        self._owns_cache = cache is None
+        self.cache = load_cache() if cache is None else cache
+        self.cache_entry: Dict[str, Any] = {}
+        self._owns_client = client is None
+        self.client = create_client(config) if client is None else client
+        
+    def _report(self, text: str, color: str = Colors.WHITE) -> None:
+        """Print a progress message unless the checker is quiet."""
+        if not self.quiet:
+            print_colored(text, color)
+    
+    def _save_cache(self) -> None:
+        """Persist the cache, unless it is shared and its owner saves it."""
+        if self._owns_cache:
+            save_cache(self.cache)
+    
+    def _set_token(self, token: Optional[str]) -> None:
+        """Store the JWT token and the Authorization header derived from it."""
+        self.jwt_token = token
+        self._auth_header = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    
+    async def register_user(self, username: str, pin: str, use_cached_token: bool = True) -> bool:
+        """Register user and obtain JWT token, reusing a cached token while it is fresh.
+        
+        Pass use_cached_token=False to always register with the proxy.
+        """
+        import asyncio
+        
+        self._credentials = (username, pin)
+        self.token_from_cache = False
+        # One random salt per cache file; the slow hash runs off the event loop so
+        # batch users hash in parallel
+        salt = self.cache.setdefault('salt', secrets.token_hex(16))
+        pin_hash = await asyncio.to_thread(hash_pin, username, pin, salt)
+        entry = self.cache.setdefault(f"{username}@{self.config['PROXY_BASE_URL']}", {})
+        if entry.get('pin_hash') != pin_hash:
+            entry.clear()
+            entry['pin_hash'] = pin_hash
+        self.cache_entry = entry
+        
+        if use_cached_token and entry.get('jwt_token') and time.time() - entry.get('issued_at', 0) < self.config.get('JWT_CACHE_TTL', 900):
+            self._set_token(entry['jwt_token'])
+            self.token_from_cache = True
+            self._report(f"✓ Using cached token for user: {username}", Colors.GREEN)
+            return True
         
-    def register_user(self, username: str, pin: str) -> bool:
-        """Register user and obtain JWT token."""
         try:
-            response = self.client.post(
-                f"{self.config['PROXY_BASE_URL']}/auth/register",
+            response = await self.client.post(
+                "/auth/register",
                 json={"username": username, "pin": pin}
             )
             
             if response.status_code == 200:
-                data = response.json()
-                self.jwt_token = data.get('token')
+                data = orjson.loads(response.content)
+                self._set_token(data.get('token'))
                 if self.jwt_token:
-                    print_colored(f"✓ Registration successful for user: {username}", Colors.GREEN)
+                    entry['jwt_token'] = self.jwt_token
+                    entry['issued_at'] = time.time()
+                    self._save_cache()
+                    self._report(f"✓ Registration successful for user: {username}", Colors.GREEN)
                     return True
                 else:
-                    print_colored("✗ Registration failed: No token received", Colors.RED)
+                    self.registration_error = "Registration failed: No token received"
+                    self._report(f"✗ {self.registration_error}", Colors.RED)
                     return False
             else:
-                print_colored(f"✗ Registration failed: {response.status_code} - {response.text}", Colors.RED)
+                self.registration_error = f"Registration failed: {response.status_code} - {response.text}"
+                self._report(f"✗ {self.registration_error}", Colors.RED)
                 return False
                 
         except Exception as e:
-            print_colored(f"✗ Registration error: {e}", Colors.RED)
+            self.registration_error = f"Registration error: {describe_error(e)}"
+            self._report(f"✗ {self.registration_error}", Colors.RED)
             return False
     
-    def test_opensource_provider(self, verbose: bool = False) -> Dict[str, Any]:
-        """Test the opensource provider."""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.jwt_token}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "openai--gpt-oss-120b",
-                "messages": [
-                    {"role": "user", "content": "Say 'Health check successful' and nothing else."}
-                ],
-                "max_tokens": 10,
-                "stream": False
-            }
-            
-            response = self.client.post(
-                f"{self.config['PROXY_BASE_URL']}/opensource/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            result = {
-                "provider": "opensource",
-                "status_code": response.status_code,
-                "success": response.status_code == 200,
-                "response_time": response.elapsed.total_seconds(),
-                "error": None,
-                "response_data": None
-            }
+    def _config_value(self, key: str) -> Optional[str]:
+        """Return a config value, treating sample placeholders as unset."""
+        value = self.config.get(key)
+        if value in _PLACEHOLDERS:
+            return None
+        return value
+    
+    def _has_valid_config(self, spec: ProviderSpec) -> bool:
+        """Check that every config key the provider requires is really set."""
+        return all(self._config_value(key) is not None for key in spec.required_config_keys)
+    
+    async def _post_with_retry(self, url: str, headers: Dict[str, str],
+                               content: bytes) -> Tuple["httpx.Response", float, float, int]:
+        """POST, retrying connection failures, 429 and 5xx with jittered exponential backoff.
+        
+        Only errors raised before the request reached the proxy (connect, connect
+        timeout, pool timeout) are retried; a read timeout already spent a full
+        PROXY_TIMEOUT and is raised at once. Other 4xx responses (e.g. auth
+        failures) are returned immediately. After
+        HEALTH_MAX_RETRIES retries the last response is returned or the last error raised.
+        Returns the response, the wall-clock time across all attempts and backoff,
+        the part of it spent opening connections (0 if one was reused) and the
+        number of attempts.
+        """
+        import asyncio
+        import httpx
+        
+        max_retries = self.config.get('HEALTH_MAX_RETRIES', 2)
+        backoff_base = self.config.get('HEALTH_BACKOFF_BASE', 0.2)
+        connect_time = 0.0
+        start = time.perf_counter()
+        for attempt in range(max_retries + 1):
+            timings: Dict[str, float] = {}
             
-            if response.status_code == 200:
-                data = response.json()
-                result["response_data"] = data
-                if verbose:
-                    result["full_response"] = data
-            else:
-                result["error"] = response.text
-                
-            return result
+            async def trace(event_name: str, info: Dict[str, Any]) -> None:
+                if event_name.startswith("connection."):
+                    timings[event_name] = time.perf_counter()
             
-        except Exception as e:
-            return {
-                "provider": "opensource",
-                "status_code": 0,
-                "success": False,
-                "response_time": 0,
-                "error": str(e),
-                "response_data": None
-            }
+            try:
+                response = await self.client.post(url, headers=headers, content=content,
+                                                  extensions={"trace": trace})
+                connect_time += _connect_time(timings)
+                if attempt == max_retries or (response.status_code != 429 and response.status_code < 500):
+                    return response, time.perf_counter() - start, connect_time, attempt + 1
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                if attempt == max_retries:
+                    raise
+            await asyncio.sleep(min(MAX_BACKOFF, backoff_base * 2 ** attempt) + random.uniform(0, backoff_base))
     
-    def test_openai_provider(self, verbose: bool = False) -> Dict[str, Any]:
-        """Test the OpenAI provider."""
-        if not self.config.get('OPENAI_API_KEY') or self.config['OPENAI_API_KEY'] == 'your_openai_api_key_here':
-            return {
-                "provider": "openai",
-                "status_code": 0,
-                "success": False,
-                "response_time": 0,
-                "error": "OpenAI API key not configured",
-                "response_data": None
-            }
+    async def _run_provider(self, spec: ProviderSpec, verbose: bool = False,
+                            assert_content: bool = False) -> ProviderResult:
+        """Send one provider's health-check request and describe the outcome.
+        
+        A 200 response passes without parsing the body unless verbose output is
+        wanted; with assert_content the raw body must also contain EXPECTED_CONTENT.
+        """
+        name = spec.name
+        headers = self._auth_header
+        if spec.extra_headers:
+            headers = dict(headers)
+            for header, key in spec.extra_headers:
+                value = self._config_value(key)
+                if value is not None:
+                    headers[header] = value
         
         try:
-            headers = {
-                "Authorization": f"Bearer {self.jwt_token}",
-                "Content-Type": "application/json",
-                "X-User-OpenAI-Key": self.config['OPENAI_API_KEY']
-            }
-            
-            if self.config.get('OPENAI_ORG_ID') and self.config['OPENAI_ORG_ID'] != 'your_openai_org_id_here':
-                headers["X-User-OpenAI-Org"] = self.config['OPENAI_ORG_ID']
-            
-            payload = {
-                "model": "gpt-3.5-turbo",
-                "messages": [
-                    {"role": "user", "content": "Say 'Health check successful' and nothing else."}
-                ],
-                "max_tokens": 10,
-                "stream": False
-            }
-            
-            response = self.client.post(
-                f"{self.config['PROXY_BASE_URL']}/openai/v1/chat/completions",
-                headers=headers,
-                json=payload
+            response, response_time, connect_time, attempts = await self._post_with_retry(
+                spec.path, headers, _PAYLOADS[name]
             )
             
-            result = {
-                "provider": "openai",
-                "status_code": response.status_code,
-                "success": response.status_code == 200,
-                "response_time": response.elapsed.total_seconds(),
-                "error": None,
-                "response_data": None
-            }
+            result = ProviderResult(
+                provider=name,
+                status_code=response.status_code,
+                success=response.status_code == 200,
+                response_time=response_time,
+                connect_time=connect_time,
+                attempts=attempts
+            )
             
             if response.status_code == 200:
-                data = response.json()
-                result["response_data"] = data
+                if assert_content and EXPECTED_CONTENT not in response.content:
+                    result.success = False
+                    result.error = f"Response did not contain '{EXPECTED_CONTENT.decode()}'"
                 if verbose:
-                    result["full_response"] = data
+                    result.full_response = orjson.loads(response.content)
             else:
-                result["error"] = response.text
+                result.error = response.text
                 
             return result
             
         except Exception as e:
-            return {
-                "provider": "openai",
-                "status_code": 0,
-                "success": False,
-                "response_time": 0,
-                "error": str(e),
-                "response_data": None
-            }
+            return ProviderResult(
+                provider=name,
+                status_code=0,
+                success=False,
+                response_time=0,
+                error=describe_error(e)
+            )
     
-    def test_anthropic_provider(self, verbose: bool = False) -> Dict[str, Any]:
-        """Test the Anthropic provider."""
-        if not self.config.get('ANTHROPIC_API_KEY') or self.config['ANTHROPIC_API_KEY'] == 'your_anthropic_api_key_here':
-            return {
-                "provider": "anthropic",
-                "status_code": 0,
-                "success": False,
-                "response_time": 0,
-                "error": "Anthropic API key not configured",
-                "response_data": None
-            }
+    async def _run_provider_with_deadline(self, spec: ProviderSpec, verbose: bool = False,
+                                          assert_content: bool = False) -> ProviderResult:
+        """Run one provider check, failing it if it outlives HEALTH_WALL_BUDGET seconds."""
+        import asyncio
         
+        budget = self.config.get('HEALTH_WALL_BUDGET', 45.0)
         try:
-            headers = {
-                "Authorization": f"Bearer {self.jwt_token}",
-                "Content-Type": "application/json",
-                "X-User-Anthropic-Key": self.config['ANTHROPIC_API_KEY']
-            }
-            
-            payload = {
-                "model": "claude-3-haiku-20240307",
-                "messages": [
-                    {"role": "user", "content": "Say 'Health check successful' and nothing else."}
-                ],
-                "max_tokens": 10,
-                "stream": False
-            }
-            
-            response = self.client.post(
-                f"{self.config['PROXY_BASE_URL']}/anthropic/v1/messages",
-                headers=headers,
-                json=payload
+            return await asyncio.wait_for(self._run_provider(spec, verbose, assert_content), timeout=budget)
+        except asyncio.TimeoutError:
+            return ProviderResult(
+                provider=spec.name,
+                status_code=0,
+                success=False,
+                response_time=budget,
+                error=f"No response within the {budget:g}s wall-clock budget"
             )
-            
-            result = {
-                "provider": "anthropic",
-                "status_code": response.status_code,
-                "success": response.status_code == 200,
-                "response_time": response.elapsed.total_seconds(),
-                "error": None,
-                "response_data": None
-            }
-            
-            if response.status_code == 200:
-                data = response.json()
-                result["response_data"] = data
-                if verbose:
-                    result["full_response"] = data
-            else:
-                result["error"] = response.text
-                
-            return result
-            
-        except Exception as e:
-            return {
-                "provider": "anthropic",
-                "status_code": 0,
-                "success": False,
-                "response_time": 0,
-                "error": str(e),
-                "response_data": None
-            }
     
-    def run_health_checks(self, providers: List[str], verbose: bool = False) -> Dict[str, Any]:
-        """Run health checks for specified providers."""
+    async def run_health_checks(self, providers: List[str], verbose: bool = False,
+                                use_cache: bool = False, assert_content: bool = False) -> Dict[str, ProviderResult]:
+        """Run health checks for specified providers concurrently.
+        
+        With use_cache, providers that passed within HEALTH_CACHE_TTL seconds are
+        reported from the cache instead of being called again. With assert_content,
+        a provider only passes if its reply contains EXPECTED_CONTENT.
+        """
+        import asyncio
+        
         results = {}
+        cached_providers = self.cache_entry.setdefault('providers', {})
         
-        provider_tests = {
-            "opensource": self.test_opensource_provider,
-            "openai": self.test_openai_provider,
-            "anthropic": self.test_anthropic_provider
-        }
+        providers = [p for p in providers if p in PROVIDER_SPECS_BY_NAME]
+        if use_cache:
+            now = time.time()
+            for provider in providers:
+                cached = cached_providers.get(provider)
+                if cached and cached['success'] and now - cached['timestamp'] < self.config.get('HEALTH_CACHE_TTL', 60):
+                    results[provider] = ProviderResult(
+                        provider=provider,
+                        status_code=200,
+                        success=True,
+                        response_time=cached['response_time'],
+                        cached=True
+                    )
         
+        # Misconfigured providers fail without ever being scheduled
+        live_providers = []
         for provider in providers:
-            if provider in provider_tests:
-                print_colored(f"\nTesting {provider} provider...", Colors.BLUE)
-                result = provider_tests[provider](verbose)
-                results[provider] = result
-                
-                # Print status
-                status = "PASS" if result["success"] else "FAIL"
-                details = f"({result['response_time']:.2f}s)" if result["success"] else f"Error: {result['error']}"
-                print_status(provider.capitalize(), status, details)
-                
-                # Print verbose output if requested
-                if verbose and result.get("full_response"):
-                    print_colored(f"\nDetailed response for {provider}:", Colors.YELLOW)
-                    print(json.dumps(result["full_response"], indent=2))
+            if provider in results:
+                continue
+            spec = PROVIDER_SPECS_BY_NAME[provider]
+            if self._has_valid_config(spec):
+                live_providers.append(provider)
+            else:
+                results[provider] = ProviderResult(
+                    provider=provider,
+                    status_code=0,
+                    success=False,
+                    response_time=0,
+                    error=f"{spec.display_name} API key not configured"
+                )
+        
+        if live_providers and not self.quiet:
+            sys.stdout.write("".join(
+                colorize(f"\nTesting {provider} provider...", Colors.BLUE) + "\n" for provider in live_providers
+            ))
+            sys.stdout.flush()
+        
+        # Each test is network-bound and individually deadline-capped, so fire them
+        # together and wait for the slowest
+        tasks = [
+            self._run_provider_with_deadline(PROVIDER_SPECS_BY_NAME[provider], verbose, assert_content)
+            for provider in live_providers
+        ]
+        results_list = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # A cached token the proxy rejects was revoked, not a provider outage:
+        # register again and retry the rejected providers once
+        rejected = [
+            i for i, result in enumerate(results_list)
+            if isinstance(result, ProviderResult) and result.status_code in (401, 403)
+        ]
+        if rejected and self.token_from_cache:
+            self.cache_entry.pop('jwt_token', None)
+            if await self.register_user(*self._credentials, use_cached_token=False):
+                retried = await asyncio.gather(*[
+                    self._run_provider_with_deadline(PROVIDER_SPECS_BY_NAME[live_providers[i]], verbose, assert_content)
+                    for i in rejected
+                ], return_exceptions=True)
+                for i, result in zip(rejected, retried):
+                    results_list[i] = result
+        
+        for provider, result in zip(live_providers, results_list):
+            if isinstance(result, BaseException):
+                result = ProviderResult(
+                    provider=provider,
+                    status_code=0,
+                    success=False,
+                    response_time=0,
+                    error=describe_error(result)
+                )
+            results[provider] = result
+            cached_providers[provider] = {
+                "success": result.success,
+                "response_time": result.response_time,
+                "timestamp": time.time()
+            }
+        self._save_cache()
+        
+        results = {provider: results[provider] for provider in providers}
+        if self.quiet:
+            return results
+        
+        # Build the whole report first so it reaches stdout in one write, in provider order
+        buf = io.StringIO()
+        for provider in providers:
+            result = results[provider]
+            
+            # Report status
+            status = "PASS" if result.success else "FAIL"
+            if result.cached:
+                details = f"({result.response_time:.2f}s, cached)"
+            elif result.success:
+                details = f"({result.response_time:.2f}s"
+                if verbose and result.connect_time:
+                    details += f", connect {result.connect_time:.2f}s"
+                if result.attempts > 1:
+                    details += f", {result.attempts} attempts"
+                details += ")"
+            else:
+                details = f"Error: {result.error}"
+                if result.attempts > 1:
+                    details += f" (after {result.attempts} attempts)"
+            buf.write(format_status(provider, status, details))
+            buf.write("\n")
+            
+            # Report verbose output if requested
+            if verbose and result.full_response:
+                buf.write(colorize(f"\nDetailed response for {provider}:", Colors.YELLOW))
+                buf.write("\n")
+                buf.write(orjson.dumps(result.full_response, option=orjson.OPT_INDENT_2).decode())
+                buf.write("\n")
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
         
         return results
     
-    def close(self):
+    async def close(self):
         """Clean up resources."""
-        self.client.close()
+        if self._owns_client:
+            await self.client.aclose()
+
+async def check_credentials(config: Dict[str, Any], username: str, pin: str, providers: List[str],
+                            client: "httpx.AsyncClient", cache: Dict[str, Any],
+                            semaphore: "asyncio.Semaphore",
+                            verbose: bool = False,
+                            use_cache: bool = False,
+                            assert_content: bool = False) -> Tuple[Optional[str], Dict[str, ProviderResult]]:
+    """Register one user and run their health checks on a shared client.
+    
+    The semaphore bounds how many users are in flight at once. Returns the
+    registration error (None on success) and the provider results.
+    """
+    async with semaphore:
+        checker = HealthChecker(config, client=client, cache=cache, quiet=True)
+        if not await checker.register_user(username, pin):
+            return checker.registration_error, {}
+        return None, await checker.run_health_checks(providers, verbose, use_cache, assert_content)
 
+def read_credentials(path: str) -> List[Tuple[str, str]]:
+    """Read username,pin rows from a CSV file, skipping blank lines and a header row."""
+    credentials = []
+    # utf-8-sig strips the byte-order mark that spreadsheet "CSV UTF-8" exports start with
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            row = [field.strip() for field in row]
+            if len(row) < 2 or not row[0]:
+                continue
+            if not credentials and row[0].lower() == 'username' and row[1].lower() == 'pin':
+                continue
+            credentials.append((row[0], row[1]))
+    return credentials
+
+@functools.lru_cache(maxsize=1)
 def load_config() -> Dict[str, Any]:
-    """Load configuration from .env file."""
+    """Load configuration from .env file.
+    
+    The result is cached for the life of the process; treat it as read-only.
+    """
+    from dotenv import load_dotenv
+    
     # Load .env file from the health-checks directory
     env_path = os.path.join(os.path.dirname(__file__), '.env')
     load_dotenv(env_path)
@@ -309,7 +707,13 @@ def load_config() -> Dict[str, Any]:
         'OPENAI_ORG_ID': os.getenv('OPENAI_ORG_ID'),
         'ANTHROPIC_API_KEY': os.getenv('ANTHROPIC_API_KEY'),
         'PROXY_BASE_URL': os.getenv('PROXY_BASE_URL', 'http://aitools.cs.vt.edu:7860'),
-        'PROXY_TIMEOUT': int(os.getenv('PROXY_TIMEOUT', '30')),
+        'PROXY_TIMEOUT': int(os.getenv('PROXY_TIMEOUT', DEFAULT_PROXY_TIMEOUT)),
+        'PROXY_PIN_DNS': os.getenv('PROXY_PIN_DNS', '1') != '0',
+        'HEALTH_WALL_BUDGET': float(os.getenv('HEALTH_WALL_BUDGET', '45')),
+        'HEALTH_MAX_RETRIES': int(os.getenv('HEALTH_MAX_RETRIES', '2')),
+        'HEALTH_BACKOFF_BASE': float(os.getenv('HEALTH_BACKOFF_BASE', '0.2')),
+        'JWT_CACHE_TTL': float(os.getenv('JWT_CACHE_TTL', '900')),
+        'HEALTH_CACHE_TTL': float(os.getenv('HEALTH_CACHE_TTL', '60')),
         'DEFAULT_USERNAME': os.getenv('DEFAULT_USERNAME'),
         'DEFAULT_PIN': os.getenv('DEFAULT_PIN')
     }
@@ -328,6 +732,10 @@ Examples:
     python health_checker.py --username alice --pin 1234 --show-token      # Show JWT token after registration
     python health_checker.py --username alice --pin 1234 --token-only      # Only register and show token
     python health_checker.py --username alice --pin 1234 --provider openai # Test only OpenAI (requires API key)
+    python health_checker.py --username alice --pin 1234 --provider all    # Test all providers concurrently
+    python health_checker.py --username alice --pin 1234 --use-cache       # Skip providers that passed recently
+    python health_checker.py --batch students.csv                          # Check every username,pin row concurrently
+    python health_checker.py --username alice --pin 1234 --json            # Machine-readable output for CI/monitoring
     
     # If DEFAULT_USERNAME and DEFAULT_PIN are set in .env file:
     python health_checker.py                    # Uses credentials from .env file
@@ -341,39 +749,77 @@ Examples:
                        help='Display the JWT token after registration')
     parser.add_argument('--token-only', action='store_true',
                        help='Only register and show token, skip health checks')
-    parser.add_argument('--provider', choices=['openai', 'anthropic', 'opensource'],
-                       help='Test only specific provider')
+    parser.add_argument('--provider', choices=[*PROVIDER_SPECS_BY_NAME, 'all'],
+                       help='Test only specific provider, or all providers concurrently')
+    parser.add_argument('--use-cache', action='store_true',
+                       help='Reuse provider results that passed within HEALTH_CACHE_TTL seconds')
     parser.add_argument('--username', help='Username for authentication (required if not in .env)')
     parser.add_argument('--pin', help='PIN for authentication (required if not in .env)')
+    parser.add_argument('--assert-content', action='store_true',
+                       help="Also require each reply to contain 'Health check successful'")
+    parser.add_argument('--json', action='store_true',
+                       help='Print a single machine-readable JSON document instead of the colored report')
+    parser.add_argument('--batch', metavar='CSV',
+                       help='Check every username,pin row of a CSV file concurrently on one connection pool')
+    parser.add_argument('--concurrency', type=int, default=16,
+                       help='Maximum users checked at once in --batch mode (default: 16)')
     
     args = parser.parse_args()
+    if args.batch and (args.token_only or args.show_token):
+        parser.error("--batch cannot be combined with --token-only or --show-token")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    
+    import asyncio
     
     # Load configuration
     config = load_config()
     
+    try:
+        return asyncio.run(run_batch(args, config) if args.batch else run(args, config))
+    except KeyboardInterrupt:
+        if args.json:
+            emit_json({"error": "interrupted"})
+        else:
+            print_colored("\n\nHealth check interrupted by user.", Colors.YELLOW)
+        return 1
+
+def select_providers(args: argparse.Namespace) -> List[str]:
+    """Determine which providers to test."""
+    if args.provider == 'all':
+        return list(PROVIDER_SPECS_BY_NAME)
+    if args.provider:
+        return [args.provider]
+    return ['opensource']  # Default to opensource only for students
+
+async def run(args: argparse.Namespace, config: Dict[str, Any]) -> int:
+    """Register the user and run the requested health checks."""
     # Determine username and pin
     username = args.username or config['DEFAULT_USERNAME']
     pin = args.pin or config['DEFAULT_PIN']
     
     # Check if username and pin are available
+    error = None
     if not username:
-        print_colored("Error: Username is required. Provide --username or set DEFAULT_USERNAME in .env file.", Colors.RED)
+        error = "Username is required. Provide --username or set DEFAULT_USERNAME in .env file."
+    elif not pin:
+        error = "PIN is required. Provide --pin or set DEFAULT_PIN in .env file."
+    if error:
+        if args.json:
+            emit_json({"error": error})
+        else:
+            print_colored(f"Error: {error}", Colors.RED)
         return 1
     
-    if not pin:
-        print_colored("Error: PIN is required. Provide --pin or set DEFAULT_PIN in .env file.", Colors.RED)
-        return 1
-    
-    # Determine which providers to test
-    if args.provider:
-        providers = [args.provider]
-    else:
-        providers = ['opensource']  # Default to opensource only for students
+    providers = select_providers(args)
     
     # Initialize health checker
-    checker = HealthChecker(config)
+    checker = HealthChecker(config, quiet=args.json)
     
     try:
+        if args.json:
+            return await report_json(checker, args, username, pin, providers)
+        
         print_header("AI Tools LLM Proxy Health Checker")
         print_colored(f"Proxy URL: {config['PROXY_BASE_URL']}", Colors.CYAN)
         print_colored(f"Username: {username}", Colors.CYAN)
@@ -381,7 +827,7 @@ Examples:
         
         # Register user
         print_colored(f"\nRegistering user '{username}'...", Colors.BLUE)
-        if not checker.register_user(username, pin):
+        if not await checker.register_user(username, pin, use_cached_token=not (args.show_token or args.token_only)):
             print_colored("Registration failed. Cannot proceed with health checks.", Colors.RED)
             return 1
         
@@ -397,13 +843,14 @@ Examples:
         
         # Run health checks
         print_header("Health Check Results")
-        results = checker.run_health_checks(providers, args.verbose)
+        results = await checker.run_health_checks(providers, args.verbose, args.use_cache, args.assert_content)
         
         # Summary
         print_header("Summary")
-        total_tests = len(results)
-        passed_tests = sum(1 for r in results.values() if r["success"])
-        failed_tests = total_tests - passed_tests
+        summary = summarize(list(results.values()))
+        total_tests = summary["total"]
+        passed_tests = summary["passed"]
+        failed_tests = summary["failed"]
         
         print_colored(f"Total Tests: {total_tests}", Colors.CYAN)
         print_colored(f"Passed: {passed_tests}", Colors.GREEN)
@@ -412,14 +859,112 @@ Examples:
         # Return appropriate exit code
         return 0 if failed_tests == 0 else 1
         
-    except KeyboardInterrupt:
-        print_colored("\n\nHealth check interrupted by user.", Colors.YELLOW)
-        return 1
     except Exception as e:
-        print_colored(f"\nUnexpected error: {e}", Colors.RED)
+        if args.json:
+            emit_json({"error": f"Unexpected error: {e}"})
+        else:
+            print_colored(f"\nUnexpected error: {e}", Colors.RED)
         return 1
     finally:
-        checker.close()
+        await checker.close()
+
+async def report_json(checker: HealthChecker, args: argparse.Namespace, username: str, pin: str,
+                      providers: List[str]) -> int:
+    """Register and run the checks silently, then emit the outcome as one JSON document."""
+    report: Dict[str, Any] = {"proxy_url": checker.config['PROXY_BASE_URL'], "username": username}
+    if not await checker.register_user(username, pin, use_cached_token=not (args.show_token or args.token_only)):
+        report["error"] = checker.registration_error
+        emit_json(report)
+        return 1
+    
+    if args.show_token or args.token_only:
+        report["token"] = checker.jwt_token
+    if not args.token_only:
+        results = list((await checker.run_health_checks(providers, args.verbose, args.use_cache, args.assert_content)).values())
+        report["providers"] = results
+        report["summary"] = summarize(results)
+    emit_json(report)
+    
+    return 0 if args.token_only or report["summary"]["failed"] == 0 else 1
+
+async def run_batch(args: argparse.Namespace, config: Dict[str, Any]) -> int:
+    """Check every user in a credentials CSV concurrently over one shared client."""
+    import asyncio
+    
+    try:
+        credentials = read_credentials(args.batch)
+        error = None if credentials else f"No username,pin rows found in {args.batch}"
+    except (OSError, ValueError, csv.Error) as e:
+        # ValueError covers files that are not valid UTF-8
+        error = f"Cannot read credentials file: {e}"
+    if error:
+        if args.json:
+            emit_json({"error": error})
+        else:
+            print_colored(f"Error: {error}", Colors.RED)
+        return 1
+    
+    providers = select_providers(args)
+    if not args.json:
+        print_header("AI Tools LLM Proxy Batch Health Checker")
+        print_colored(f"Proxy URL: {config['PROXY_BASE_URL']}", Colors.CYAN)
+        print_colored(f"Users: {len(credentials)}", Colors.CYAN)
+        print_colored(f"Providers: {', '.join(providers)}", Colors.CYAN)
+    
+    # Every user's registration and checks share one pool sized to the concurrency cap
+    client = create_client(config, max_connections=4 * args.concurrency)
+    cache = load_cache()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    try:
+        outcomes = await asyncio.gather(*[
+            check_credentials(
+                config, username, pin, providers, client, cache, semaphore,
+                args.verbose, args.use_cache, args.assert_content
+            )
+            for username, pin in credentials
+        ])
+    finally:
+        await client.aclose()
+    # Users share the cache, so it is written once for the whole batch
+    save_cache(cache)
+    
+    passed_users = sum(
+        1 for error, results in outcomes if error is None and all(r.success for r in results.values())
+    )
+    failed_users = len(credentials) - passed_users
+    
+    if args.json:
+        emit_json({
+            "proxy_url": config['PROXY_BASE_URL'],
+            "users": [
+                {"username": username, "error": error, "providers": list(results.values())}
+                for (username, _), (error, results) in zip(credentials, outcomes)
+            ],
+            "summary": {"total": len(credentials), "passed": passed_users, "failed": failed_users}
+        })
+        return 0 if failed_users == 0 else 1
+    
+    print_header("Batch Results")
+    for (username, _), (error, results) in zip(credentials, outcomes):
+        success = error is None and all(r.success for r in results.values())
+        details = error or ", ".join(
+            f"{provider} ({result.response_time:.2f}s)" if result.success else f"{provider}: {result.error}"
+            for provider, result in results.items()
+        )
+        status_text = "[PASS]" if success else "[FAIL]"
+        print_colored(f"{username:<20} {status_text:<8} {details}", Colors.GREEN if success else Colors.RED)
+        if args.verbose:
+            for provider, result in results.items():
+                if result.full_response:
+                    print_colored(f"\nDetailed response for {username}/{provider}:", Colors.YELLOW)
+                    print(orjson.dumps(result.full_response, option=orjson.OPT_INDENT_2).decode())
+    
+    print_header("Summary")
+    print_colored(f"Total Users: {len(credentials)}", Colors.CYAN)
+    print_colored(f"Passed: {passed_users}", Colors.GREEN)
+    print_colored(f"Failed: {failed_users}", Colors.RED if failed_users > 0 else Colors.GREEN)
+    
+    return 0 if failed_users == 0 else 1
 
 if __name__ == "__main__":
     sys.exit(main())